@@ -0,0 +1,426 @@
+# Allocation_Service.py
+"""
+Long-running allocation service.
+
+Keeps the fleet (vehicles, chargers and the backlog of waiting tasks) resident in memory
+and answers task arrivals over local HTTP or a Unix socket. Requests that arrive within
+a short batching window are handed to the allocator in a single call, the same way the
+simulation loop in Report.ipynb hands all waiting tasks of a time step to the strategy.
+
+Only the standard library is imported at module level; pandas and the allocator modules
+are imported on first use (or by the background warm-up), so the service starts fast.
+
+Endpoints (JSON bodies, a single object or a list of objects):
+    POST /vehicles  add or update vehicles, keyed by "Vehicle ID"
+    POST /chargers  add or update chargers, keyed by "Charger ID"
+    POST /tasks     add tasks keyed by "Task ID" and wait for the batch they are allocated in
+    POST /tick      advance the fleet clock by {"minutes": n} (default 1), freeing vehicles whose task is done
+    POST /allocate  re-run the allocator on the waiting tasks (e.g. after vehicles free up)
+    GET  /state     current fleet, chargers, waiting tasks and allocations
+
+Allocated vehicles stay Busy until their Remaining Duration has run out. Either drive the
+clock with POST /tick, as the time step of compare() does, or report the finished task
+yourself with POST /vehicles {"Vehicle ID": ..., "Busy": false, "Remaining Duration": 0}.
+
+Usage:
+    python Allocation_Service.py --strategy auction_without_charger --port 8080
+    python Allocation_Service.py --unix-socket /tmp/allocation.sock --batch-window-ms 5
+"""
+import argparse
+import importlib
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Strategy name -> (module, function, needs_chargers). Modules are only imported when the
+# strategy is used; strategies that need chargers are called with Charger_df as third argument.
+STRATEGIES = {
+    "greedy_basic": ("fleet_greedy_allocationDynamic", "greedy_basic", False),
+    "greedy_positionupdate": ("fleet_greedy_allocationDynamic", "greedy_positionupdate", False),
+    "auction_without_charger": ("Auction_Allocation", "auction_without_charger", False),
+    "auction_with_charger": ("Auction_with_Charger", "auction_with_charger", True),
+    "QL": ("QL_Allocation", "QL_without_charger", False),
+}
+
+# Status columns added to every vehicle, as in compare() of Report.ipynb
+VEHICLE_DEFAULTS = {
+    "Busy": False,
+    "Remaining Duration": 0.0,
+    "Idle Time": 0.0,
+    "Charging": False,
+    "Charger ID": None,
+}
+
+# Fields a new vehicle, charger or task must carry before it joins the resident state
+VEHICLE_FIELDS = ("Vehicle ID", "Vehicle Position (x, y)", "Battery Level (%)", "Speed")
+CHARGER_FIELDS = ("Charger ID", "Charger Position (x, y)")
+TASK_FIELDS = ("Task ID", "Task Position (x, y)", "Urgency", "Duration (min)")
+
+CHARGER_DEFAULTS = {
+    "Available After": 0,
+    "Busy": False,
+}
+
+# Fields converted on the way in, so bad input is rejected before it reaches the resident state
+POSITION_FIELDS = ("Vehicle Position (x, y)", "Charger Position (x, y)", "Task Position (x, y)")
+NUMBER_FIELDS = ("Battery Level (%)", "Speed", "Remaining Duration", "Idle Time", "Available After",
+                 "Urgency", "Duration (min)")
+FLAG_FIELDS = ("Busy", "Charging")
+
+
+class AllocationError(RuntimeError):
+    """The allocator failed on a batch; a service-side error, not a bad request."""
+
+
+def load_strategy(name):
+    """
+    Import the allocator for the given strategy name.
+    Returns:
+        function: allocator taking (vehicles_df, tasks_df) or (vehicles_df, tasks_df, Charger_df)
+    """
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {name!r}, expected one of {sorted(STRATEGIES)}")
+    module_name, function_name, _ = STRATEGIES[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _as_number(field, value):
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number, got {value!r}") from None
+
+
+def _as_position(field, value):
+    # JSON has no tuples, the allocators and the generated data use (x, y) tuples
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError(f"{field} must be [x, y], got {value!r}")
+    return (_as_number(field, value[0]), _as_number(field, value[1]))
+
+
+def _convert_fields(record):
+    """Convert the known fields of an incoming record in place. Raises ValueError on bad values."""
+    for field in POSITION_FIELDS:
+        if field in record:
+            record[field] = _as_position(field, record[field])
+    for field in NUMBER_FIELDS:
+        if field in record:
+            record[field] = _as_number(field, record[field])
+    for field in FLAG_FIELDS:
+        if field in record and not isinstance(record[field], bool):
+            raise ValueError(f"{field} must be true or false, got {record[field]!r}")
+    return record
+
+
+def _to_json(obj):
+    # numpy scalars coming back from the allocators
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+class AllocationService:
+    """
+    Resident fleet state plus a micro-batching worker in front of one allocator.
+    """
+
+    def __init__(self, strategy="auction_without_charger", batch_window=0.005):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {sorted(STRATEGIES)}")
+        self.strategy = strategy
+        self.batch_window = batch_window    # seconds to wait for more requests before allocating
+
+        self.vehicles = {}          # Vehicle ID -> vehicle record
+        self.chargers = {}          # Charger ID -> charger record
+        self.tasks_waiting = []     # backlog of tasks not allocated yet
+        self.allocations = {}       # cumulative allocations: Task ID -> Vehicle ID
+
+        self._function = None
+        self._pending = []          # requests waiting for the next batch
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._batch_loop, name="allocation-batcher", daemon=True)
+        self._worker.start()
+
+    def warm_up(self):
+        """Import pandas and the allocator ahead of the first request."""
+        importlib.import_module("pandas")
+        if self._function is None:
+            self._function = load_strategy(self.strategy)
+
+    # --- fleet updates ---
+    def update_vehicles(self, vehicles):
+        """
+        Add new vehicles or merge the given fields into known ones.
+        A new vehicle also gets a charger at its first position, as get_charger() does in the report.
+        The request is rejected as a whole if a new vehicle lacks one of VEHICLE_FIELDS
+        or a field has the wrong type.
+        """
+        with self._cond:
+            # check every update before touching the fleet
+            updates, new_ids = [], set()
+            for update in vehicles:
+                if "Vehicle ID" not in update:
+                    raise KeyError("Vehicle ID")
+                update = dict(update)
+                if update["Vehicle ID"] not in self.vehicles and update["Vehicle ID"] not in new_ids:
+                    for field in VEHICLE_FIELDS:
+                        if field not in update:
+                            raise KeyError(field)
+                    new_ids.add(update["Vehicle ID"])
+                updates.append(_convert_fields(update))
+
+            for update in updates:
+                vehicle_id = update["Vehicle ID"]
+                if vehicle_id in self.vehicles:
+                    self.vehicles[vehicle_id].update(update)
+                    continue
+                vehicle = dict(VEHICLE_DEFAULTS)
+                vehicle.update(update)
+                self.vehicles[vehicle_id] = vehicle
+
+                charger_id = f"C{len(self.chargers) + 1}"
+                if charger_id not in self.chargers:
+                    charger = {"Charger ID": charger_id, "Charger Position (x, y)": vehicle["Vehicle Position (x, y)"]}
+                    charger.update(CHARGER_DEFAULTS)
+                    self.chargers[charger_id] = charger
+
+    def update_chargers(self, chargers):
+        """
+        Add new chargers or merge the given fields into known ones.
+        The request is rejected as a whole if a new charger lacks one of CHARGER_FIELDS
+        or a field has the wrong type.
+        """
+        with self._cond:
+            # check every update before touching the chargers
+            updates, new_ids = [], set()
+            for update in chargers:
+                if "Charger ID" not in update:
+                    raise KeyError("Charger ID")
+                update = dict(update)
+                if update["Charger ID"] not in self.chargers and update["Charger ID"] not in new_ids:
+                    for field in CHARGER_FIELDS:
+                        if field not in update:
+                            raise KeyError(field)
+                    new_ids.add(update["Charger ID"])
+                updates.append(_convert_fields(update))
+
+            for update in updates:
+                charger = self.chargers.setdefault(update["Charger ID"], dict(CHARGER_DEFAULTS))
+                charger.update(update)
+
+    def tick(self, minutes=1):
+        """
+        Advance the fleet clock, as the busy-vehicle update of compare() does per time step.
+        Busy vehicles count down their Remaining Duration and are freed when it runs out,
+        idle vehicles accumulate Idle Time and busy chargers count down Available After.
+        Returns:
+            freed: IDs of the vehicles that became free.
+        """
+        minutes = float(minutes)
+        if minutes < 0:
+            raise ValueError("minutes must not be negative")
+        freed = []
+        with self._cond:
+            for vehicle_id, vehicle in self.vehicles.items():
+                if vehicle["Busy"]:
+                    vehicle["Remaining Duration"] = float(vehicle["Remaining Duration"]) - minutes
+                    if vehicle["Remaining Duration"] <= 0:
+                        vehicle["Busy"] = False
+                        vehicle["Remaining Duration"] = 0.0
+                        freed.append(vehicle_id)
+                else:
+                    vehicle["Idle Time"] = float(vehicle["Idle Time"]) + minutes
+            for charger in self.chargers.values():
+                if charger["Busy"]:
+                    charger["Available After"] = charger["Available After"] - minutes
+                    if charger["Available After"] <= 0:
+                        charger["Busy"] = False
+                        charger["Available After"] = 0
+        return freed
+
+    def state(self):
+        with self._cond:
+            return {
+                "strategy": self.strategy,
+                "vehicles": list(self.vehicles.values()),
+                "chargers": list(self.chargers.values()),
+                "tasks_waiting": list(self.tasks_waiting),
+                "allocations": dict(self.allocations),
+            }
+
+    # --- allocation ---
+    def submit_tasks(self, tasks):
+        """
+        Add tasks to the backlog and block until the batch they joined has been allocated.
+        If the allocator fails on that batch, its new tasks are taken out of the backlog again
+        and AllocationError is raised.
+        Returns:
+            allocations: Dictionary mapping task IDs to vehicle IDs for the whole batch.
+            engagement_details: List of per-task metrics dictionaries for the whole batch.
+            tasks_waiting: IDs of the tasks still waiting after the batch.
+        """
+        new_tasks = []
+        for task in tasks:
+            for field in TASK_FIELDS:
+                if field not in task:
+                    raise KeyError(field)
+            new_tasks.append(_convert_fields(dict(task)))
+        request = {"tasks": new_tasks, "done": threading.Event(), "result": None}
+        with self._cond:
+            self.tasks_waiting.extend(new_tasks)
+            self._pending.append(request)
+            self._cond.notify()
+        request["done"].wait()
+        if isinstance(request["result"], Exception):
+            exc = request["result"]
+            raise AllocationError(f"Allocation failed: {type(exc).__name__}: {exc}") from exc
+        return request["result"]
+
+    def _batch_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # let the requests arriving within the window join this batch
+            time.sleep(self.batch_window)
+            with self._cond:
+                pending, self._pending = self._pending, []
+                try:
+                    result = self._allocate()
+                except Exception as exc:
+                    result = exc
+                    # keep a failing request from poisoning the backlog of later batches
+                    failed = {id(task) for request in pending for task in request["tasks"]}
+                    self.tasks_waiting = [task for task in self.tasks_waiting if id(task) not in failed]
+            for request in pending:
+                request["result"] = result
+                request["done"].set()
+
+    def _allocate(self):
+        """Run the allocator once on the resident fleet and the whole backlog. Caller holds the lock."""
+        allocations, engagement_details = {}, []
+        if self.tasks_waiting and self.vehicles:
+            import pandas as pd
+
+            if self._function is None:
+                self._function = load_strategy(self.strategy)
+            vehicles_df = pd.DataFrame(list(self.vehicles.values()))
+            tasks_df = pd.DataFrame(self.tasks_waiting)
+            if STRATEGIES[self.strategy][2]:
+                Charger_df = pd.DataFrame(list(self.chargers.values()))
+                allocations, engagement_details = self._function(vehicles_df, tasks_df, Charger_df)
+                self.chargers = {c["Charger ID"]: c for c in Charger_df.to_dict("records")}
+            else:
+                allocations, engagement_details = self._function(vehicles_df, tasks_df)
+            # the allocators update the vehicles in place, keep their view of the fleet
+            self.vehicles = {v["Vehicle ID"]: v for v in vehicles_df.to_dict("records")}
+            self.allocations.update(allocations)
+            self.tasks_waiting = [task for task in self.tasks_waiting if task["Task ID"] not in allocations]
+        return {
+            "allocations": allocations,
+            "engagement_details": engagement_details,
+            "tasks_waiting": [task["Task ID"] for task in self.tasks_waiting],
+        }
+
+
+class AllocationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so clients do not reconnect per decision
+    service = None                  # set by make_server()
+
+    def do_GET(self):
+        if self.path == "/state":
+            self._reply(200, self.service.state())
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"[]")
+            items = body if isinstance(body, list) else [body]
+            if self.path == "/vehicles":
+                self.service.update_vehicles(items)
+                self._reply(200, {"vehicles": len(self.service.vehicles)})
+            elif self.path == "/chargers":
+                self.service.update_chargers(items)
+                self._reply(200, {"chargers": len(self.service.chargers)})
+            elif self.path == "/tasks":
+                self._reply(200, self.service.submit_tasks(items))
+            elif self.path == "/tick":
+                if items and not isinstance(items[0], dict):
+                    raise TypeError(f'/tick expects {{"minutes": n}}, got {items[0]!r}')
+                minutes = items[0].get("minutes", 1) if items else 1
+                self._reply(200, {"freed": self.service.tick(minutes)})
+            elif self.path == "/allocate":
+                self._reply(200, self.service.submit_tasks([]))
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+        except AllocationError as exc:
+            self._reply(500, {"error": str(exc)})
+        except (ValueError, KeyError, TypeError) as exc:
+            self._reply(400, {"error": f"{type(exc).__name__}: {exc}"})
+        except Exception as exc:
+            self._reply(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        # logging every decision to stderr costs more than the decision itself
+        pass
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload, default=_to_json).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host="127.0.0.1", port=8080, unix_socket=None):
+    """Bind an HTTP server for the service on a local TCP port or a Unix socket."""
+    handler = type("BoundAllocationRequestHandler", (AllocationRequestHandler,), {"service": service})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Long-running task allocation service")
+    parser.add_argument("--strategy", default="auction_without_charger", choices=sorted(STRATEGIES))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix-socket", default=None, help="serve on this Unix socket instead of TCP")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0,
+                        help="requests arriving within this window share one allocator call")
+    args = parser.parse_args(argv)
+
+    service = AllocationService(args.strategy, batch_window=args.batch_window_ms / 1000)
+    server = make_server(service, args.host, args.port, args.unix_socket)
+    # accept connections right away, the heavy imports happen in the background
+    threading.Thread(target=service.warm_up, name="allocation-warm-up", daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+
+
+if __name__ == "__main__":
+    main()
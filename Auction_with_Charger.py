@@ -1,8 +1,5 @@
 import pandas as pd
 import numpy as np
-import random
-import matplotlib.pyplot as plt
-import DataGenerationDynamic as dgd 
 
 def calculate_distance(vehicle_pos, task_pos):
     return np.sqrt((vehicle_pos[0] - task_pos[0])**2 + (vehicle_pos[1] - task_pos[1])**2)
@@ -133,6 +130,8 @@ def auction_with_charger(vehicles_df, tasks_df,Charger_df):
         # this is so the engagement time can be calculated correctly.
 
         engagement_time = float(best_bid["Engagement Time"])
+        # the task won by the best bid (not the last task of the bidding loop)
+        task = tasks_df[tasks_df["Task ID"] == best_bid["Task ID"]].iloc[0]
         allocations[task["Task ID"]] = best_bid["Vehicle ID"]
         vehicle_idx = vehicles_df.index[vehicles_df['Vehicle ID'] == best_bid['Vehicle ID']].tolist()[0]
         vehicles_df.at[vehicle_idx, 'Battery Level (%)'] = float(vehicles_df.at[vehicle_idx, 'Battery Level (%)']) - engagement_time
@@ -1,7 +1,6 @@
 import numpy as np
 import pandas as pd
 import random
-from matplotlib import pyplot as plt
 
 
 def calculate_distance(vehicle_pos, task_pos):
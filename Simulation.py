@@ -0,0 +1,257 @@
+# Simulation.py
+"""
+Time-stepped fleet simulation used by compare() in Report.ipynb.
+
+A Simulation owns everything a run mutates: the vehicles and chargers DataFrames, the
+backlog of waiting tasks, the state of the random generators and the metric accumulators.
+That state can be written to a compressed binary checkpoint and restored later, or forked
+in-process so several strategies can branch from one shared warm-up run:
+
+    sim = Simulation(vehicles_df, initial_tasks, greedy_basic, Charger_df)
+    sim.run(500)
+    data = sim.checkpoint()                       # bytes, can be written to disk
+    branches = {f.__name__: sim.fork(f).run(1000).metrics() for f in [greedy_basic, auction_with_charger]}
+    resumed = Simulation.restore(data)            # same state as sim at t=500
+"""
+import pickle
+import random
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Default simulation parameters (same as Report.ipynb)
+NEW_TASK_PROB = 0.5       # Probability a new task arrives at a time step
+URGENCY_INCREMENT = 1     # Urgency increases by this amount each time step
+
+CHECKPOINT_VERSION = 1
+
+
+def get_charger(vehicles_df):
+    """
+    Create Charger DataFrame by using first location of vehicles
+    return: Charger DataFrame
+    """
+    Vehicle_Charger = []
+    for idx, vehicle in vehicles_df.iterrows():
+        Vehicle_Charger.append({
+                    'Charger ID': f"C{idx+1}",
+                    'Charger Position (x, y)': vehicle["Vehicle Position (x, y)"],
+                    'Available After ': 0,
+                    'Busy': False
+                })
+    Vehicle_Charger=pd.DataFrame(Vehicle_Charger)
+    return Vehicle_Charger
+
+
+def compute_metrics(engagement_metrics, vehicles_df):
+    if not engagement_metrics:
+        return {}
+    num_tasks = len(engagement_metrics)
+    total_engagement_time = sum(item["engagement_time"] for item in engagement_metrics)
+    avg_engagement_time = total_engagement_time / num_tasks
+    avg_normalized_engagement = sum(item["normalized_engagement_time"] for item in engagement_metrics) / num_tasks
+    total_task_duration = sum(item["task_duration"] for item in engagement_metrics)
+    total_energy_consumed = sum(item["energy_consumed"] for item in engagement_metrics)
+    energy_per_unit = total_energy_consumed / total_task_duration if total_task_duration > 0 else None
+    throughput = total_task_duration
+    total_idle_time = vehicles_df["Idle Time"].sum()
+    avg_idle_time = total_idle_time / len(vehicles_df)
+    return {
+        "num_tasks": num_tasks,                          # Total number of tasks completed
+        "avg_engagement_time": avg_engagement_time,        # Average time each task required (including travel)
+        "avg_normalized_engagement": avg_normalized_engagement,  # Ratio of (engagement_time / task_duration)
+        "energy_per_unit": energy_per_unit,                # Energy consumed per minute of intrinsic task duration
+        "throughput": throughput,                          # Total intrinsic task duration completed
+        "total_idle_time": total_idle_time,                # Cumulative idle time (min) across all vehicles
+        "avg_idle_time": avg_idle_time                     # Average idle time per vehicle (min)
+    }
+
+
+class Simulation:
+    """
+    State and time step of one simulation run with one allocation strategy.
+
+    The allocators draw from the global `random` and `np.random` generators, so each
+    Simulation keeps its own copy of their state and swaps it in while it steps.
+    A single run therefore consumes the global generators exactly like the old loop,
+    and forks do not disturb each other.
+    """
+
+    def __init__(self, vehicles_df, initial_tasks, function, Charger_df=None, random_task_csv=None,
+                 new_task_prob=NEW_TASK_PROB, urgency_increment=URGENCY_INCREMENT):
+        """
+        @param vehicles_df  vehicles with the status columns (Busy, Remaining Duration, Idle Time, Charging, Charger ID)
+        @param initial_tasks  DataFrame of the tasks waiting at t=0
+        @param function  the allocation strategy
+        @param Charger_df  chargers, built from the vehicle positions if not given
+        @param random_task_csv  CSV to replay/record dynamic task arrivals, None for random arrivals only
+        """
+        self.function = function
+        self.vehicles = vehicles_df
+        self.Charger_df = Charger_df if Charger_df is not None else get_charger(vehicles_df)
+        self.random_task_csv = random_task_csv
+        self.new_task_prob = new_task_prob
+        self.urgency_increment = urgency_increment
+
+        self.t = 0
+        self.task_counter = 1
+        self.tasks_waiting = initial_tasks.to_dict('records')
+
+        # Metric accumulators
+        self.allocations = {}
+        self.engagement_metrics = []
+
+        self.rng_state = (random.getstate(), np.random.get_state())
+
+    def run(self, until):
+        """Step the simulation until time step `until` (exclusive). Returns self."""
+        while self.t < until:
+            self.step()
+        return self
+
+    def step(self):
+        """Advance the simulation by one time step (one minute)."""
+        random.setstate(self.rng_state[0])
+        np.random.set_state(self.rng_state[1])
+        try:
+            self._update_vehicles()
+            self._update_charging()
+            # --- Increase urgency for waiting tasks ---
+            for task in self.tasks_waiting:
+                task['Urgency'] += self.urgency_increment
+            self._task_arrival()
+            self._allocate()
+        finally:
+            self.rng_state = (random.getstate(), np.random.get_state())
+        self.t += 1
+
+    def metrics(self):
+        return compute_metrics(self.engagement_metrics, self.vehicles)
+
+    # --- checkpointing ---
+    def fork(self, function=None, random_task_csv=None):
+        """
+        Branch a new simulation from the current state, optionally switching strategy.
+        Only the state the simulation mutates is copied; recorded engagement details,
+        which are never modified, are shared with the parent.
+        The branch records its dynamic task arrivals to `random_task_csv` (not at all by default),
+        never to the parent's CSV, so branches cannot overwrite the arrival record of the parent run.
+        """
+        child = object.__new__(Simulation)
+        child.__dict__.update(self.__dict__)
+        if function is not None:
+            child.function = function
+        child.random_task_csv = random_task_csv
+        child.vehicles = self.vehicles.copy()
+        child.Charger_df = self.Charger_df.copy()
+        child.tasks_waiting = [dict(task) for task in self.tasks_waiting]
+        child.allocations = dict(self.allocations)
+        child.engagement_metrics = list(self.engagement_metrics)
+        return child
+
+    def checkpoint(self):
+        """
+        Serialize the simulation state to a compact binary checkpoint.
+        The strategy is stored by reference (module and name), so it must be importable on restore.
+        """
+        state = dict(self.__dict__, version=CHECKPOINT_VERSION)
+        return zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def restore(cls, data, function=None):
+        """
+        Rebuild a simulation from checkpoint(), optionally switching strategy.
+        Checkpoints are unpickled, so only restore them from trusted sources.
+        """
+        state = pickle.loads(zlib.decompress(data))
+        version = state.pop("version", None)
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {version}, expected {CHECKPOINT_VERSION}")
+        sim = object.__new__(cls)
+        sim.__dict__.update(state)
+        if function is not None:
+            sim.function = function
+        return sim
+
+    # --- time step phases ---
+    def _update_vehicles(self):
+        # --- Update busy vehicles & idle time ---
+        vehicles = self.vehicles
+        for idx, vehicle in vehicles.iterrows():
+            if vehicle['Busy']:
+                new_duration = vehicle['Remaining Duration'] - 1
+                vehicles.at[idx, 'Remaining Duration'] = new_duration
+                if new_duration <= 0:
+                    vehicles.at[idx, 'Busy'] = False
+                    vehicles.at[idx, 'Remaining Duration'] = 0
+            else:
+                vehicles.at[idx, 'Idle Time'] = float(vehicle['Idle Time']) + 1
+
+    def _update_charging(self):
+        # --- Update charging vehicles & idle time ---
+        vehicles, Charger_df = self.vehicles, self.Charger_df
+        for idx, vehicle in vehicles.iterrows():
+            if vehicle['Charging']:
+                new_duration = vehicle['Remaining Duration'] - 1
+                new_avaliable = Charger_df.at[vehicle['Charger ID'], 'Available After ']-1
+                vehicles.at[idx, 'Idle Time'] = float(vehicle['Idle Time']) + 1
+                vehicles.at[idx, 'Remaining Duration'] = new_duration
+                Charger_df.at[vehicle['Charger ID'], 'Available After '] = new_avaliable
+
+                if new_duration <= 0:
+                    vehicles.at[idx, 'Battery Level (%)'] = vehicles.at[idx, 'Battery Level (%)'] + 1
+                    if Charger_df.at[vehicle['Charger ID'], 'Available After '] == 0:
+                        cid=vehicles.at[idx, 'Charger ID']
+                        vehicles.at[idx, 'Charging'] = False
+                        vehicles.at[idx, 'Remaining Duration'] = 0
+                        vehicles.at[idx, 'Battery Level (%)'] = 100
+                        vehicles.at[idx, 'Busy'] = False
+                        vehicles.at[idx, 'Charger ID'] = None
+                        vehicles.at[idx, 'Charger Position (x, y)'] = None
+                        Charger_df.at[cid, 'Available After '] = 0
+                        Charger_df.at[cid, 'Busy'] = False
+
+    def _task_arrival(self):
+        # --- Dynamic task arrival --- Loading from the CSV file to Compare Strategies
+        try:
+            with open(self.random_task_csv, 'r') as f:
+                for line in f:
+                    parts = line.strip().split(',')
+                    new_task = {
+                        'Task ID': parts[1],
+                        'Task Position (x, y)': (int(parts[2]), int(parts[3])),
+                        'Urgency': int(parts[4]),
+                        'Duration (min)': int(parts[5])
+                    }
+
+                    if self.t == int(parts[0]):
+
+                        self.tasks_waiting.append(new_task.copy())
+        except (TypeError, OSError, ValueError, IndexError):
+
+            if random.random() < self.new_task_prob:
+                new_task = {
+                    'Task ID': f"D{self.task_counter}",
+                    'Task Position (x, y)': (random.randint(0, 100), random.randint(0, 100)),
+                    'Urgency': random.randint(0, 9),
+                    'Duration (min)': random.randint(10, 30)
+                }
+                self.task_counter += 1
+                self.tasks_waiting.append(new_task.copy())
+                if self.random_task_csv is not None:
+                    new_tasks = pd.DataFrame(self.tasks_waiting)
+                    new_tasks.to_csv(self.random_task_csv, index=False)
+
+    def _allocate(self):
+        # --- Process waiting tasks using the strategy ---
+        if self.tasks_waiting:
+            tasks_df = pd.DataFrame(self.tasks_waiting)
+            if "with_charger" in self.function.__name__ :
+                alloc, details = self.function(self.vehicles, tasks_df, self.Charger_df)
+            else:
+                alloc, details = self.function(self.vehicles, tasks_df)
+            self.allocations.update(alloc)
+            self.engagement_metrics.extend(details)
+            allocated_ids = set(alloc.keys())
+            self.tasks_waiting = [task for task in self.tasks_waiting if task['Task ID'] not in allocated_ids]